@@ -1,15 +1,25 @@
 # backend/app.py
 # -*- coding: utf-8 -*-
 
+# gevent debe parchear sockets antes de importar requests para que las
+# llamadas a DeepL cedan el control mientras esperan la red.
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    monkey = None
+
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import os
-import json
+import functools
+import orjson
 import logging
 import unicodedata
 import re
 import sys
 
-from core.pipeline import TranslationPipeline
+from core.pipeline import TranslationPipeline, DEEPL_MAX_TEXTS
 from core.glossary import Glossary
 
 # ============================================================
@@ -35,6 +45,34 @@ GLOSSARY_JSON_PATH = resource_path("glossary.json")
 
 DEFAULT_PORT = 5000
 
+# Máximo de textos por petición en lote (límite de DeepL por request)
+MAX_BATCH_TEXTS = DEEPL_MAX_TEXTS
+
+# Caracteres invisibles que se eliminan del texto de entrada (NUL, ZWSP, BOM)
+_STRIP_TABLE = dict.fromkeys([0x00, 0x200B, 0xFEFF])
+
+
+def clean_input(text):
+    """
+    Quita caracteres invisibles y espacios de borde, y normaliza a NFC
+    solo cuando hace falta.
+    """
+    text = text.translate(_STRIP_TABLE).strip()
+    # Fast path: ASCII o texto ya en NFC no necesita normalizarse
+    if not text.isascii() and not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    return text
+
+
+def load_json_file(path):
+    """
+    Lee un archivo JSON en binario y lo parsea con orjson
+    (evita la decodificación UTF-8 intermedia).
+    """
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("interprete-backend")
 
@@ -44,8 +82,7 @@ logger = logging.getLogger("interprete-backend")
 CONFIG = {}
 if os.path.exists(CONFIG_PATH):
     try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            CONFIG = json.load(f)
+        CONFIG = load_json_file(CONFIG_PATH)
     except Exception as e:
         logger.warning("Could not load config.json: %s", e)
 
@@ -55,14 +92,27 @@ PORT = int(CONFIG.get("PORT", DEFAULT_PORT))
 # ============================================================
 # 3. Load glossary.json
 # ============================================================
+@functools.lru_cache(maxsize=2)
+def _glossary_at(path, mtime, size):
+    return Glossary(load_json_file(path), use_regex_module=CONFIG.get("USE_REGEX_MODULE", True))
+
+
+def load_glossary():
+    """
+    Glossary compilado, memoizado por (ruta, mtime, tamaño): si
+    glossary.json no cambió se reutiliza la instancia sin recompilar.
+    Lanza la excepción si el archivo falta o es inválido.
+    """
+    st = os.stat(GLOSSARY_JSON_PATH)
+    return _glossary_at(GLOSSARY_JSON_PATH, st.st_mtime, st.st_size)
+
+
+# Solo al arrancar se tolera un glosario ausente o inválido
 try:
-    with open(GLOSSARY_JSON_PATH, "r", encoding="utf-8") as f:
-        glossary_data = json.load(f)
+    glossary = load_glossary()
 except Exception as e:
     logger.warning("Could not load glossary.json: %s", e)
-    glossary_data = []
-
-glossary = Glossary(glossary_data)
+    glossary = Glossary([])
 
 # ============================================================
 # 4. Initialize pipeline
@@ -72,10 +122,70 @@ pipeline = TranslationPipeline(
     deepl_api_key=DEEPL_API_KEY
 )
 
+
+def warm_up():
+    """
+    Ejecuta una vez las etapas locales del pipeline (sin DeepL) para que
+    la primera petición real no pague el arranque en frío.
+    """
+    try:
+        pipeline.normalizer.normalize("warmup  texto .")
+        pipeline.detect_language_simple("warmup hello mundo")
+        for src in ("es", "en"):
+            glossary.apply_placeholders("a b c", src)
+        pipeline.protector.protect("warmup 10 mg CT 12345")
+    except Exception as e:
+        logger.warning("Warm-up failed: %s", e)
+
+
+warm_up()
+
+
+class _UncacheableResult(Exception):
+    """Lleva un resultado degradado fuera de lru_cache sin almacenarlo."""
+
+    def __init__(self, result):
+        super().__init__("DeepL fallback result")
+        self.result = result
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_run_or_raise(text):
+    result = pipeline.run(text)
+    # Si DeepL falló no se cachea: el próximo intento debe volver a llamarlo
+    if result.get("deepl_failed"):
+        raise _UncacheableResult(result)
+    return result
+
+
+def cached_run(text):
+    """
+    pipeline.run memoizado sobre el texto ya normalizado.
+    Las entradas repetidas se sirven sin volver a llamar a DeepL.
+    """
+    try:
+        return _cached_run_or_raise(text)
+    except _UncacheableResult as e:
+        return e.result
+
 # ============================================================
 # 5. Flask App
 # ============================================================
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask basado en orjson: request.get_json() y
+    jsonify() parsean/serializan en C en lugar del módulo json estándar.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 @app.route("/", methods=["GET"])
 def root():
@@ -89,12 +199,13 @@ def health():
     return jsonify({
         "status": "ok",
         "backend": "interprete-notepad",
-        "glossary_entries": glossary.size()
+        "glossary_entries": glossary.size(),
+        "translate_cache": _cached_run_or_raise.cache_info()._asdict()
     }), 200
 
 @app.route("/translate", methods=["POST"])
 def translate():
-    logger.info("\n>>> ENTERED TRANSLATE ENDPOINT <<<\n")
+    logger.debug("\n>>> ENTERED TRANSLATE ENDPOINT <<<\n")
 
     try:
         payload = request.get_json(force=True)
@@ -106,34 +217,79 @@ def translate():
 
     text = payload["text"]
 
-    if not isinstance(text, str):
-        return jsonify({"error": "'text' must be a string"}), 400
+    # 'text' puede ser un string o una lista (lote traducido con una sola
+    # petición a DeepL por idioma destino)
+    is_batch = isinstance(text, list)
+    texts = text if is_batch else [text]
+
+    if is_batch and not texts:
+        return jsonify({"error": "'text' list cannot be empty"}), 400
+
+    if len(texts) > MAX_BATCH_TEXTS:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_TEXTS} texts"}), 413
 
-    if not text.strip():
-        return jsonify({"error": "'text' cannot be empty"}), 400
+    for t in texts:
+        if not isinstance(t, str):
+            return jsonify({"error": "'text' must be a string or a list of strings"}), 400
 
-    if len(text) > 5000:
-        return jsonify({"error": "Text exceeds 5000 characters"}), 413
+        if not t.strip():
+            return jsonify({"error": "'text' cannot be empty"}), 400
 
-    text = (
-        text.replace("\x00", "")
-            .replace("\u200b", "")
-            .replace("\ufeff", "")
-            .strip()
-    )
-    text = unicodedata.normalize("NFC", text)
+        if len(t) > 5000:
+            return jsonify({"error": "Text exceeds 5000 characters"}), 413
+
+    texts = [clean_input(t) for t in texts]
 
     try:
-        result = pipeline.run(text)
-        translated_text = result["translated_text"]
-        detected_source = result["detected_source"]
+        if is_batch:
+            results = pipeline.run_batch(texts)
+        elif request.args.get("nocache") == "1":
+            results = [pipeline.run(texts[0])]
+        else:
+            results = [cached_run(texts[0])]
     except Exception as e:
         logger.error("Pipeline failed: %s", e)
         return jsonify({"error": "Translation pipeline internal error"}), 500
 
+    if is_batch:
+        return jsonify({
+            "translated_text": [r["translated_text"] for r in results],
+            "detected_source": [r["detected_source"] for r in results]
+        }), 200
+
     return jsonify({
-        "translated_text": translated_text,
-        "detected_source": detected_source
+        "translated_text": results[0]["translated_text"],
+        "detected_source": results[0]["detected_source"]
+    }), 200
+
+
+@app.post("/reload")
+def reload_glossary():
+    """
+    Recarga glossary.json sin reiniciar el proceso. Si el archivo cambió,
+    vacía la caché de traducciones (pueden depender de términos antiguos).
+    Si no se puede cargar, se conserva el glosario actual.
+    """
+    global glossary
+
+    try:
+        reloaded = load_glossary()
+    except Exception as e:
+        logger.error("Could not reload glossary.json: %s", e)
+        return jsonify({
+            "status": "error",
+            "error": f"Could not load glossary.json: {e}",
+            "glossary_entries": glossary.size()
+        }), 500
+
+    if reloaded is not glossary:
+        glossary = reloaded
+        pipeline.glossary = glossary
+        _cached_run_or_raise.cache_clear()
+
+    return jsonify({
+        "status": "ok",
+        "glossary_entries": glossary.size()
     }), 200
 
 
@@ -157,4 +313,9 @@ def debug_glossary():
 # ============================================================
 if __name__ == "__main__":
     logger.info("Starting Interprete Notepad backend on 127.0.0.1:%d", PORT)
-    app.run(host="127.0.0.1", port=PORT, debug=False)
+    if monkey is not None:
+        # Servidor WSGI cooperativo: muchas peticiones en vuelo hacia DeepL
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(("127.0.0.1", PORT), app).serve_forever()
+    else:
+        app.run(host="127.0.0.1", port=PORT, debug=False, threaded=True)
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('glossary.json', '.'), ('config.json', '.'), ('core', 'core')],
-    hiddenimports=['requests', 'core.pipeline', 'core.glossary', 'core.normalizer', 'core.protector'],
+    hiddenimports=['requests', 'orjson', 'ahocorasick', 'gevent', 'core.pipeline', 'core.glossary', 'core.normalizer', 'core.protector'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -17,7 +17,7 @@ if %errorlevel% neq 0 (
 
 echo Instalando dependencias necesarias...
 pip install --upgrade pip
-pip install flask requests
+pip install flask requests orjson pyahocorasick gevent
 
 REM =======================================================
 REM Limpiar builds previos
@@ -33,6 +33,9 @@ echo Compilando backend con PyInstaller...
 
 pyinstaller --noconfirm --onefile ^
     --hidden-import=requests ^
+    --hidden-import=orjson ^
+    --hidden-import=ahocorasick ^
+    --hidden-import=gevent ^
     --hidden-import=core.pipeline ^
     --hidden-import=core.glossary ^
     --hidden-import=core.normalizer ^
@@ -1,10 +1,19 @@
 # core/pipeline.py
 # -*- coding: utf-8 -*-
+import functools
+import html
 import logging
+import re
 import requests
-import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # parses DeepL responses straight from bytes
+except ImportError:
+    orjson = None
+
 from .normalizer import TextNormalizer
-from .glossary import Glossary
+from .glossary import Glossary, PLACEHOLDER_RE
 from .protector import TextProtector
 
 logger = logging.getLogger("pipeline")
@@ -12,13 +21,101 @@ logger.setLevel(logging.INFO)
 
 DEEPL_URL = "https://api-free.deepl.com/v2/translate"
 
+# Shared keep-alive session: reuses the TCP/TLS connection to DeepL
+_SESSION = requests.Session()
+# gzip'd responses (requests decompresses transparently)
+_SESSION.headers["Accept-Encoding"] = "gzip"
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Sends independent DeepL requests (per target language and chunk) in parallel
+# over the pooled session; cooperative greenlets under gevent
+_DEEPL_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deepl")
+
+# Language detection keywords
+WORD_RE = re.compile(r"\w+")
+ES_ACCENTS = frozenset("áéíóúüñ")
+ENG_COMMON = frozenset(["the", "and", "is", "patient", "need", "requires", "dr"])
+SPA_COMMON = frozenset(["el", "la", "y", "es", "paciente", "necesita", "requer"])
+ASCII_ALPHA_RE = re.compile(r"[A-Za-z]")
+ALPHA_RE = re.compile(r"[^\W\d_]")
+
+# What DeepL would leave alone: glossary tags, §protected§ numbers and unit
+# symbols, and the XML entities of escaped user text. All-caps words
+# (§TIENE§, §CT§) still count as text to translate
+_PASSTHROUGH_RE = re.compile(PLACEHOLDER_RE.pattern + r"|§(?![A-Z]{2,6}§)[^§]*§|&[#\w]+;")
+# Restore pass: glossary tags, the § markers around protected tokens and
+# XML entities (user text is escaped before it is sent to DeepL)
+_RESTORE_RE = re.compile(PLACEHOLDER_RE.pattern + r"|§|&[#\w]+;")
+# At least one word of two or more letters left -> worth a DeepL call
+_TRANSLATABLE_RE = re.compile(r"[^\W\d_]{2,}")
+
+# DeepL accepts up to 50 `text` fields per request
+DEEPL_MAX_TEXTS = 50
+# Requests larger than this (total chars) bypass the DeepL cache to bound memory
+DEEPL_CACHE_MAX_CHARS = 4096
+
+
+def _protect_xml(text: str) -> str:
+    """
+    Protect technical tokens and XML-escape the user text between glossary
+    tags, so only the glossary's own <x id="N"/> tags reach DeepL as markup.
+    """
+    return html.escape(TextProtector.protect(text), quote=False)
+
+
+def _restore_token(token: str, placeholder_map: dict) -> str:
+    if token == "§":
+        return ""
+    if token[0] == "&":
+        return html.unescape(token)
+    return placeholder_map.get(token, token)
+
+
+@functools.lru_cache(maxsize=1024)
+def _detect_language(text: str) -> str:
+    """Cached body of TranslationPipeline.detect_language_simple."""
+    t = text.lower()
+    # ASCII text cannot contain accents (str.isascii is O(1))
+    is_ascii = text.isascii()
+    # accented characters indicate Spanish
+    if not is_ascii and not ES_ACCENTS.isdisjoint(t):
+        return "es"
+    # tokenize once, then O(1) set lookups per keyword
+    tokens = set(WORD_RE.findall(t))
+    eng_hits = len(tokens & ENG_COMMON)
+    spa_hits = len(tokens & SPA_COMMON)
+    if eng_hits > spa_hits:
+        return "en"
+    if spa_hits > eng_hits:
+        return "es"
+    if is_ascii:
+        # every letter is ASCII: ratio is 1.0 whenever there are letters
+        return "en" if any(map(str.isalpha, text)) else "es"
+    # letter counting in C via regex instead of per-character generators
+    ascii_letters = len(ASCII_ALPHA_RE.findall(text))
+    total_letters = len(ALPHA_RE.findall(text))
+    if total_letters == 0:
+        return "es"
+    if ascii_letters / total_letters > 0.85:
+        return "en"
+    return "es"
+
+
 class TranslationPipeline:
+    # Keep-alive session shared by every pipeline (class attribute so a
+    # subclass or test can swap in its own)
+    session = _SESSION
+
     def __init__(self, glossary: Glossary, deepl_api_key: str = None, deepl_url: str = DEEPL_URL):
         self.glossary = glossary
         self.deepl_key = deepl_api_key
         self.deepl_url = deepl_url or DEEPL_URL
+        # Header auth (built once) instead of an auth_key form field per request
+        self._deepl_headers = {"Authorization": f"DeepL-Auth-Key {deepl_api_key}"}
         self.normalizer = TextNormalizer()
         self.protector = TextProtector()
+        # Identical (texts, target) requests are served without a round-trip
+        self._call_deepl_cached = functools.lru_cache(maxsize=512)(self._call_deepl)
 
     def detect_language_simple(self, text: str) -> str:
         """
@@ -29,80 +126,166 @@ class TranslationPipeline:
         """
         if not isinstance(text, str) or not text.strip():
             return "es"
-        t = text.lower()
-        # accented characters indicate Spanish
-        if any(ch in t for ch in "áéíóúüñ"):
-            return "es"
-        eng_common = ["the", "and", "is", "patient", "need", "requires", "dr"]
-        spa_common = ["el", "la", "y", "es", "paciente", "necesita", "requer"]
-        eng_hits = sum(1 for w in eng_common if f" {w} " in f" {t} ")
-        spa_hits = sum(1 for w in spa_common if f" {w} " in f" {t} ")
-        if eng_hits > spa_hits:
-            return "en"
-        if spa_hits > eng_hits:
-            return "es"
-        ascii_letters = sum(1 for ch in text if ord(ch) < 128 and ch.isalpha())
-        total_letters = sum(1 for ch in text if ch.isalpha())
-        if total_letters == 0:
-            return "es"
-        if ascii_letters / total_letters > 0.85:
-            return "en"
-        return "es"
+        return _detect_language(text)
 
-    def _call_deepl(self, text: str, target_lang: str) -> str:
+    def _call_deepl(self, texts, target_lang: str):
+        """
+        Translate one string, or a list of up to DEEPL_MAX_TEXTS strings
+        sent as repeated `text` fields in a single DeepL request.
+        Returns a string or a list in the same order.
+        """
         if not self.deepl_key:
             raise RuntimeError("DeepL API key not configured.")
-        payload = {
-            "auth_key": self.deepl_key,
-            "text": text,
-            "target_lang": target_lang.upper()
-        }
-        resp = requests.post(self.deepl_url, data=payload, timeout=15)
+        single = isinstance(texts, str)
+        results = self._post_deepl([texts] if single else list(texts), target_lang)
+        return results[0] if single else results
+
+    def _post_deepl(self, chunk: list, target_lang: str) -> list:
+        """One DeepL request for up to DEEPL_MAX_TEXTS texts."""
+        payload = [
+            ("target_lang", target_lang.upper()),
+            ("tag_handling", "xml"),
+            ("ignore_tags", "x"),
+        ]
+        payload.extend(("text", t) for t in chunk)
+        resp = self.session.post(
+            self.deepl_url, data=payload, headers=self._deepl_headers,
+            timeout=15, allow_redirects=False
+        )
+        # Redirects are not followed, and raise_for_status() lets a 3xx through
+        if 300 <= resp.status_code < 400:
+            raise RuntimeError(f"DeepL redirected ({resp.status_code}): check deepl_url")
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content) if orjson is not None else resp.json()
         translations = data.get("translations")
-        if translations and len(translations) > 0:
-            return translations[0].get("text", "")
-        raise RuntimeError("DeepL returned unexpected response")
+        if not translations or len(translations) != len(chunk):
+            raise RuntimeError("DeepL returned unexpected response")
+        # still XML-escaped: _finish decodes entities and restores tags in one pass
+        return [t.get("text", "") for t in translations]
 
-    def run(self, text: str) -> dict:
-        logger.info("Pipeline: starting")
-        # 1. normalize user text (keep accents for final output but normalize spaces etc.)
+    def _prepare(self, text: str) -> dict:
+        """Steps 1-4: normalize, detect, glossary placeholders, protect."""
+        # 1. normalize user text (keep accents for final output but normalize spaces etc.);
+        # TextNormalizer already returns NFC
         normalized = self.normalizer.normalize(text)
-        normalized = unicodedata.normalize("NFC", normalized)
+
+        if not normalized:
+            # only whitespace / invisible chars: nothing to detect, scan or translate
+            return {
+                "detected": "es",
+                "target": "EN",
+                "protected": "",
+                "placeholder_map": {},
+                "needs_deepl": False,
+            }
 
         # 2. detect language -> 'es' or 'en'
         detected = self.detect_language_simple(normalized)
         logger.info("Pipeline: detected language=%s", detected)
 
-        # 3. apply glossary placeholders based on detected source language
-        # glossary.apply_placeholders returns (text_with_placeholders, placeholder_map, had_hits)
-        with_placeholders, placeholder_map, had_hits = self.glossary.apply_placeholders(normalized, detected)
-        logger.debug("Pipeline: with_placeholders=%s", with_placeholders)
+        # 3+4. apply glossary placeholders based on detected source language and
+        # protect + XML-escape the text between them (units, acronyms patterns),
+        # in the same splice; returns (protected_text, placeholder_map, had_hits)
+        protected, placeholder_map, had_hits = self.glossary.apply_placeholders(
+            normalized, detected, _protect_xml
+        )
         logger.debug("Pipeline: placeholder_map=%s", placeholder_map)
-
-        # 4. protect technical tokens (units, acronyms patterns)
-        protected = self.protector.protect(with_placeholders)
         logger.debug("Pipeline: protected text=%s", protected)
 
-        # 5. call DeepL (if configured) for the rest (target depends on detected)
-        translated = protected
-        try:
-            if self.deepl_key and protected.strip():
-                target = "EN" if detected == "es" else "ES"
-                logger.info("Pipeline: calling DeepL target=%s", target)
-                translated = self._call_deepl(protected, target)
-            else:
-                logger.info("Pipeline: DeepL key missing or empty text -> skipping DeepL")
-        except Exception as e:
-            logger.warning("Pipeline: DeepL failed: %s. Falling back to protected text.", e)
-            translated = protected
-
-        # 6. unprotect technical tokens
-        restored_tech = self.protector.unprotect(translated)
-        logger.debug("Pipeline: restored tech=%s", restored_tech)
-
-        # 7. restore glossary placeholders with their final glossary-driven values
-        final = self.glossary.restore_placeholders(restored_tech, placeholder_map)
-        logger.info("Pipeline: finished")
-        return {"translated_text": final, "detected_source": detected}
+        return {
+            "detected": detected,
+            "target": "EN" if detected == "es" else "ES",
+            "protected": protected,
+            "placeholder_map": placeholder_map,
+            # nothing left for DeepL when only placeholders, protected
+            # numbers/units, digits or punctuation remain
+            "needs_deepl": bool(_TRANSLATABLE_RE.search(_PASSTHROUGH_RE.sub(" ", protected))),
+        }
+
+    def _finish(self, prepared: dict, translated: str, deepl_failed: bool) -> dict:
+        """Steps 6-7: unprotect technical tokens and restore glossary terms."""
+        placeholder_map = prepared["placeholder_map"]
+        if not placeholder_map:
+            # 6. unprotect technical tokens and unescape (no glossary terms to restore)
+            final = html.unescape(self.protector.unprotect(translated))
+        else:
+            # 6+7. one pass: drop § markers, unescape entities and restore
+            # glossary placeholders with their final glossary-driven values
+            final = _RESTORE_RE.sub(
+                lambda m: _restore_token(m.group(0), placeholder_map),
+                translated
+            )
+        logger.debug("Pipeline: restored text=%s", final)
+        return {
+            "translated_text": final,
+            "detected_source": prepared["detected"],
+            "deepl_failed": deepl_failed
+        }
+
+    def run(self, text: str) -> dict:
+        """Single text: same path as run_batch (one DeepL request at most)."""
+        return self.run_batch([text])[0]
+
+    def run_batch(self, texts: list) -> list:
+        """
+        Translate several texts: one DeepL request per target language
+        (per DEEPL_MAX_TEXTS texts) instead of one per text. Identical
+        (texts, target) requests are served from the DeepL cache.
+        """
+        logger.info("Pipeline: starting batch of %d", len(texts))
+        # 1-4. normalize, detect, glossary placeholders, protect
+        prepared = [self._prepare(t) for t in texts]
+        translated = [p["protected"] for p in prepared]
+        failed = [False] * len(prepared)
+
+        by_target = {}
+        if self.deepl_key:
+            for i, p in enumerate(prepared):
+                if p["needs_deepl"]:
+                    by_target.setdefault(p["target"], []).append(i)
+                else:
+                    logger.info("Pipeline: nothing translatable outside glossary terms -> skipping DeepL")
+        else:
+            logger.info("Pipeline: DeepL key missing -> skipping DeepL")
+
+        # 5. call DeepL, at most DEEPL_MAX_TEXTS texts per request; the
+        # requests are independent, so with several they go out
+        # concurrently, a lone request runs inline
+        jobs = [
+            (target, idxs[k:k + DEEPL_MAX_TEXTS])
+            for target, idxs in by_target.items()
+            for k in range(0, len(idxs), DEEPL_MAX_TEXTS)
+        ]
+        futures = []
+        if len(jobs) > 1:
+            futures = [
+                _DEEPL_POOL.submit(self._request_deepl, prepared, idxs, target)
+                for target, idxs in jobs
+            ]
+
+        for n, (target, idxs) in enumerate(jobs):
+            try:
+                if futures:
+                    out = futures[n].result()
+                else:
+                    out = self._request_deepl(prepared, idxs, target)
+            except Exception as e:
+                logger.warning("Pipeline: DeepL failed: %s. Falling back to protected text.", e)
+                for i in idxs:
+                    failed[i] = True
+                continue
+            for i, t in zip(idxs, out):
+                translated[i] = t
+
+        # 6-7. unprotect + restore glossary terms
+        results = [self._finish(p, t, f) for p, t, f in zip(prepared, translated, failed)]
+        logger.info("Pipeline: finished batch")
+        return results
+
+    def _request_deepl(self, prepared: list, idxs: list, target: str) -> list:
+        """One DeepL request for the protected texts at idxs."""
+        logger.info("Pipeline: calling DeepL target=%s texts=%d", target, len(idxs))
+        batch = tuple(prepared[i]["protected"] for i in idxs)
+        if sum(map(len, batch)) > DEEPL_CACHE_MAX_CHARS:
+            return self._call_deepl(batch, target)
+        return self._call_deepl_cached(batch, target)
@@ -3,6 +3,28 @@
 
 import re
 
+# Las tres reglas en una sola alternancia (una pasada sobre el texto),
+# compilada una vez al importar; el grupo que coincidió (lastgroup)
+# decide el reemplazo
+_PROTECT_RE = re.compile(
+    # Evita alteración de unidades (kg → kilograms, etc.)
+    r"(?P<unit>\b(?P<qty>\d+)\s?(?P<sym>kg|g|mg|L|mL|km|cm|mm|mol|Pa|kPa)\b)"
+    # Siglas de ingeniería / ciencia
+    r"|(?P<acr>\b[A-Z]{2,6}\b)"
+    # Números largos
+    r"|(?P<num>\b\d{4,}\b)"
+)
+
+
+def _dispatch(m):
+    if m.lastgroup == "unit":
+        qty = m.group("qty")
+        # la cantidad también es un número largo si tiene 4+ dígitos
+        if len(qty) >= 4:
+            qty = f"§{qty}§"
+        return f"{qty}§{m.group('sym')}§"
+    return f"§{m.group(0)}§"
+
 
 class TextProtector:
     """
@@ -11,28 +33,17 @@ class TextProtector:
     - Siglas
     - Unidades
     - Código técnico
+    Sin estado: los patrones viven a nivel de módulo.
     """
 
-    def __init__(self):
-        self.rules = [
-            # Evita alteración de unidades (kg → kilograms, etc.)
-            (re.compile(r"\b(\d+)\s?(kg|g|mg|L|mL|km|cm|mm|mol|Pa|kPa)\b"), r"\1§\2§"),
-
-            # Siglas de ingeniería / ciencia
-            (re.compile(r"\b([A-Z]{2,6})\b"), r"§\1§"),
-
-            # Números largos
-            (re.compile(r"\b\d{4,}\b"), r"§\g<0>§"),
-        ]
-
-    def protect(self, text):
+    @staticmethod
+    def protect(text):
         if not text:
             return text
-        for pattern, repl in self.rules:
-            text = pattern.sub(repl, text)
-        return text
+        return _PROTECT_RE.sub(_dispatch, text)
 
-    def unprotect(self, text):
+    @staticmethod
+    def unprotect(text):
         if not text:
             return text
         return text.replace("§", "")
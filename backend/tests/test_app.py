@@ -0,0 +1,45 @@
+# tests/test_app.py
+# Run from backend/: python -m unittest discover tests
+import unittest
+
+import app
+from test_pipeline import _EchoSession
+
+
+class TranslateListTest(unittest.TestCase):
+    def setUp(self):
+        self.session = _EchoSession()
+        self._saved = (app.pipeline.session, app.pipeline.deepl_key)
+        app.pipeline.session = self.session
+        app.pipeline.deepl_key = "test"
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.pipeline.session, app.pipeline.deepl_key = self._saved
+
+    def test_list_returns_parallel_lists(self):
+        texts = ["el paciente necesita ayuda", "the patient needs help", "la niña está bien"]
+        resp = self.client.post("/translate", json={"text": texts})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body["translated_text"], texts)
+        self.assertEqual(body["detected_source"], ["es", "en", "es"])
+        # one DeepL request per target language
+        self.assertEqual(sorted(self.session.batch_sizes), [1, 2])
+
+    def test_list_validation(self):
+        cases = [
+            ([], 400),
+            (["ok", 1], 400),
+            (["ok", "   "], 400),
+            (["x" * 5001], 413),
+            (["texto"] * (app.MAX_BATCH_TEXTS + 1), 413),
+        ]
+        for text, status in cases:
+            resp = self.client.post("/translate", json={"text": text})
+            self.assertEqual(resp.status_code, status, text)
+        self.assertEqual(self.session.sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
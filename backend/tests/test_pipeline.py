@@ -0,0 +1,119 @@
+# tests/test_pipeline.py
+# Run from backend/: python -m unittest discover tests
+import json
+import unittest
+
+from core.glossary import Glossary
+from core.pipeline import DEEPL_MAX_TEXTS, TranslationPipeline
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, texts):
+        self.content = json.dumps({"translations": [{"text": t} for t in texts]}).encode()
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _EchoSession:
+    """Stands in for DeepL in XML mode: returns every text field unchanged."""
+
+    def __init__(self):
+        self.sent = []
+        self.batch_sizes = []
+
+    def post(self, url, data=None, **kwargs):
+        texts = [v for k, v in data if k == "text"]
+        self.sent.extend(texts)
+        self.batch_sizes.append(len(texts))
+        return _Response(texts)
+
+
+class _RedirectSession:
+    def post(self, url, data=None, **kwargs):
+        resp = _Response([])
+        resp.status_code = 301
+        resp.content = b"<html>Moved</html>"
+        return resp
+
+
+class _FailingSession:
+    def post(self, url, data=None, **kwargs):
+        raise RuntimeError("DeepL unavailable")
+
+
+GLOSSARY = [{"term_es": "pecho", "term_en": "chest", "aliases_es": [], "aliases_en": []}]
+
+
+class UserTypedTagTest(unittest.TestCase):
+    def _pipeline(self, session):
+        pipeline = TranslationPipeline(Glossary(GLOSSARY), deepl_api_key="test")
+        pipeline.session = session
+        return pipeline
+
+    def test_user_tag_round_trips_with_glossary_hit(self):
+        session = _EchoSession()
+        text = 'el paciente tiene dolor de pecho <x id="1"/> & <b>'
+        result = self._pipeline(session).run(text)
+        self.assertEqual(result["translated_text"], 'el paciente tiene dolor de chest <x id="1"/> & <b>')
+        self.assertFalse(result["deepl_failed"])
+        # only the glossary's own tag is sent as markup
+        self.assertEqual(session.sent[0].count("<x "), 1)
+
+    def test_user_tag_round_trips_without_glossary_hit(self):
+        text = 'the patient typed <x id="0"/> here'
+        result = self._pipeline(_EchoSession()).run(text)
+        self.assertEqual(result["translated_text"], text)
+
+    def test_user_tag_round_trips_when_deepl_fails(self):
+        text = 'el paciente tiene dolor de pecho <x id="1"/>'
+        result = self._pipeline(_FailingSession()).run(text)
+        self.assertEqual(result["translated_text"], 'el paciente tiene dolor de chest <x id="1"/>')
+        self.assertTrue(result["deepl_failed"])
+
+
+class RedirectTest(unittest.TestCase):
+    def test_redirect_is_an_explicit_error(self):
+        pipeline = TranslationPipeline(Glossary(GLOSSARY), deepl_api_key="test")
+        pipeline.session = _RedirectSession()
+        with self.assertRaisesRegex(RuntimeError, "redirected"):
+            pipeline._call_deepl(("hello there",), "ES")
+
+
+class NeedsDeeplTest(unittest.TestCase):
+    def _run(self, text):
+        session = _EchoSession()
+        pipeline = TranslationPipeline(Glossary(GLOSSARY), deepl_api_key="test")
+        pipeline.session = session
+        return pipeline.run(text), session.sent
+
+    def test_all_caps_text_is_sent_to_deepl(self):
+        for text in ("TIENE FIEBRE", "NO TOS", "PAIN IN CHEST"):
+            _, sent = self._run(text)
+            self.assertEqual(len(sent), 1, text)
+
+    def test_numbers_and_units_only_skip_deepl(self):
+        result, sent = self._run("500 mg, 12345")
+        self.assertEqual(sent, [])
+        self.assertFalse(result["deepl_failed"])
+
+
+class RunBatchTest(unittest.TestCase):
+    def test_large_batch_is_split_into_deepl_sized_requests(self):
+        session = _EchoSession()
+        pipeline = TranslationPipeline(Glossary(GLOSSARY), deepl_api_key="test")
+        pipeline.session = session
+        texts = [f"el paciente tiene fiebre {i}" for i in range(2 * DEEPL_MAX_TEXTS + 1)]
+        results = pipeline.run_batch(texts)
+        self.assertEqual(sorted(session.batch_sizes), [1, DEEPL_MAX_TEXTS, DEEPL_MAX_TEXTS])
+        self.assertEqual([r["translated_text"] for r in results], texts)
+        self.assertFalse(any(r["deepl_failed"] for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
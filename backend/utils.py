@@ -1,10 +1,27 @@
 # utils.py
+import functools
+import itertools
 import re
 import unicodedata
 
+# Reglas médicas específicas (con límites de palabra): una sola alternancia
+# y un mapa término -> corrección. Toda coincidencia se reemplaza por la forma
+# del mapa, en minúsculas ("VIA Oral" -> "vía oral"); las entradas identidad
+# como "oral" -> "oral" solo aplican esa conversión
+_MED_MAP = {
+    "via": "vía",
+    "intravenosa": "intravenosa",
+    "intramuscular": "intramuscular",
+    "subcutanea": "subcutánea",
+    "oral": "oral"
+}
+_MED_RE = re.compile(r"\b(" + "|".join(_MED_MAP) + r")\b", flags=re.IGNORECASE)
+_MULTISPACE_RE = re.compile(r"\s{2,}")
+
 # ---------------------------------------------------
 # Normalización básica de texto en español (médico)
 # ---------------------------------------------------
+@functools.lru_cache(maxsize=256)
 def normalize_spanish(text: str) -> str:
     """
     Normaliza texto en español para contexto médico:
@@ -16,23 +33,15 @@ def normalize_spanish(text: str) -> str:
     if not text:
         return text
 
-    # Normalización Unicode (previene errores raros de encoding)
-    text = unicodedata.normalize("NFC", text)
-
-    # Reglas médicas específicas (con límites de palabra)
-    medical_fixes = {
-        r"\bvia\b": "vía",
-        r"\bintravenosa\b": "intravenosa",
-        r"\bintramuscular\b": "intramuscular",
-        r"\bsubcutanea\b": "subcutánea",
-        r"\boral\b": "oral"
-    }
+    # Normalización Unicode (previene errores raros de encoding);
+    # ASCII ya está en NFC
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
 
-    for pattern, replacement in medical_fixes.items():
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    text = _MED_RE.sub(lambda m: _MED_MAP[m.group(1).lower()], text)
 
     # Limpieza de espacios extra
-    text = re.sub(r"\s{2,}", " ", text)
+    text = _MULTISPACE_RE.sub(" ", text)
 
     return text.strip()
 
@@ -51,48 +60,109 @@ def apply_glossary_placeholders(text: str, lang: str):
     - flag si hubo coincidencias
     """
 
-    from app import GLOSSARY  # cargado una sola vez en app.py
+    pattern, ascii_pattern, lookup = _glossary_matcher(_get_glossary(), lang)
+    if pattern is None:
+        return text, {}, False
+
+    if text.isascii():
+        # Texto ASCII: regex sobre bytes con solo los términos ASCII (los
+        # demás no pueden aparecer); los offsets coinciden con el str
+        if ascii_pattern is None:
+            return text, {}, False
+        matches = ascii_pattern.finditer(text.encode("ascii"))
+    else:
+        matches = pattern.finditer(text)
 
     placeholder_map = {}
-    placeholder_index = 1
-    had_hits = False
+    assigned = {}  # término -> placeholder
+    next_idx = itertools.count(1).__next__
+    parts = []
+    pos = 0
+
+    # Una sola pasada: la alternancia ya devuelve coincidencias sin solapes,
+    # la más larga primero en cada posición
+    for m in matches:
+        key = text[m.start():m.end()].lower()
+        replacement = lookup.get(key)
+        if replacement is None:
+            continue
 
-    for entry in GLOSSARY:
-        term = entry["term_es"] if lang == "es" else entry["term_en"]
-        acronym = entry.get("acronym")
-        term_en = entry.get("term_en")
+        placeholder = assigned.get(key)
+        if placeholder is None:
+            placeholder = f"__GLOSSARY_{next_idx()}__"
+            assigned[key] = placeholder
+            placeholder_map[placeholder] = replacement
 
-        if not term:
-            continue
+        parts.append(text[pos:m.start()])
+        parts.append(placeholder)
+        pos = m.end()
 
-        pattern = r"\b" + re.escape(term) + r"\b"
+    if not placeholder_map:
+        return text, placeholder_map, False
 
-        match = re.search(pattern, text, flags=re.IGNORECASE)
-        if match:
-            placeholder = f"__GLOSSARY_{placeholder_index}__"
+    parts.append(text[pos:])
+    return "".join(parts), placeholder_map, True
 
-            if acronym:
-                replacement = f"{acronym} ({term_en})"
-            else:
-                replacement = term_en
 
-            text = re.sub(pattern, placeholder, text, flags=re.IGNORECASE)
+_APP = None
+
+def _get_glossary():
+    """
+    Glosario actual de app.py (app.glossary; /reload lo reemplaza). El
+    módulo se importa una sola vez y de forma diferida para no cargar
+    app.py (configuración, servidor) al importar utils.
+    """
+    global _APP
+    if _APP is None:
+        import app
+        _APP = app
+    return _APP.glossary
 
-            placeholder_map[placeholder] = replacement
-            placeholder_index += 1
-            had_hits = True
 
-    return text, placeholder_map, had_hits
+@functools.lru_cache(maxsize=4)
+def _glossary_matcher(glossary, lang: str):
+    """
+    Regex combinada (términos más largos primero), su versión bytes con los
+    términos ASCII y mapa término -> texto final ya formateado, compiladas
+    una vez por glosario e idioma (un glosario recargado se recompila).
+    """
+    lookup = {}
+    for entry in glossary.entries:
+        term = entry["term_es"] if lang == "es" else entry["term_en"]
+        if term and term.lower() not in lookup:
+            acronym = entry.get("acronym")
+            term_en = entry.get("term_en")
+            lookup[term.lower()] = f"{acronym} ({term_en})" if acronym else term_en
+
+    pattern = ascii_pattern = None
+    if lookup:
+        terms = sorted(lookup, key=len, reverse=True)
+        pattern = re.compile(
+            r"\b(?:" + "|".join(map(re.escape, terms)) + r")\b",
+            flags=re.IGNORECASE
+        )
+        ascii_terms = [t.encode("ascii") for t in terms if t.isascii()]
+        if ascii_terms:
+            ascii_pattern = re.compile(
+                rb"\b(?:" + b"|".join(map(re.escape, ascii_terms)) + rb")\b",
+                flags=re.IGNORECASE
+            )
+
+    return pattern, ascii_pattern, lookup
+
+# Restaurar el texto final (una sola pasada sobre el texto)
+_PLACEHOLDER_RE = re.compile(r"__GLOSSARY_\d+__")
 
-# Restaurar el texto final
 def reconstruct_text(text: str, placeholder_map: dict) -> str:
-    for placeholder, final_value in placeholder_map.items():
-        text = text.replace(placeholder, final_value)
-    return text
+    return _PLACEHOLDER_RE.sub(lambda m: placeholder_map.get(m.group(0), m.group(0)), text)
 
 #Call DeepL API
 import requests
 
+# Sesión compartida: keep-alive evita un handshake TCP+TLS por llamada
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 def call_deepl(text, source_lang, target_lang, api_key):
     url = "https://api-free.deepl.com/v2/translate"
     
@@ -104,7 +174,10 @@ def call_deepl(text, source_lang, target_lang, api_key):
         "preserve_formatting": True
     }
 
-    r = requests.post(url, data=data, timeout=10)
+    r = _SESSION.post(url, data=data, timeout=10, allow_redirects=False)
+    # Sin seguir redirecciones un 3xx no es un error para raise_for_status
+    if 300 <= r.status_code < 400:
+        raise RuntimeError(f"DeepL respondió con redirección {r.status_code}: revisa la URL")
     r.raise_for_status()
     
     return r.json()["translations"][0]["text"]
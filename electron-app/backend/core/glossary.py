@@ -1,15 +1,41 @@
 # core/glossary.py
 # -*- coding: utf-8 -*-
+import functools
+import itertools
 import re
+import sys
 import unicodedata
 from typing import List, Dict, Tuple
 
+try:
+    import ahocorasick  # pyahocorasick (opcional, acelera el escaneo)
+except ImportError:
+    ahocorasick = None
+
+try:
+    import regex  # módulo `regex` (opcional): motor alternativo a `re`
+except ImportError:
+    regex = None
+
+# Placeholders are self-closing <x id="N"/> tags: with tag_handling=xml +
+# ignore_tags=x DeepL treats them as opaque markup, no content to translate
+PLACEHOLDER_RE = re.compile(r'<x id="\d+"/>')
+
 
 def _norm(s: str) -> str:
-    """Normalize and strip strings to NFC."""
+    """Normalize and strip strings to NFC (interned: repeated terms share one object)."""
     if s is None:
         return ""
-    return unicodedata.normalize("NFC", s.strip())
+    return sys.intern(unicodedata.normalize("NFC", s.strip()))
+
+
+def _keep(s: str) -> str:
+    return s
+
+
+def _is_word_char(ch: str) -> bool:
+    """Same boundary rule as the regex guard (?<![A-Za-z0-9])."""
+    return ch.isascii() and ch.isalnum()
 
 
 class Glossary:
@@ -21,24 +47,47 @@ class Glossary:
       ✓ Respeta idioma fuente detectado
     """
 
-    def __init__(self, entries: List[Dict]):
+    def __init__(self, entries: List[Dict], use_regex_module: bool = True):
         self.entries = entries or []
-        self.compiled: List[Tuple[re.Pattern, Dict, str, str]] = []
+        # Regex engine for the alternations: third-party `regex` when
+        # installed and enabled, stdlib `re` otherwise (same patterns)
+        self._re = regex if use_regex_module and regex is not None else re
+
+        # Normalized columns (SoA): row i of each list belongs to entries[i]
+        self.term_es: List[str] = [_norm(e.get("term_es", "")) for e in self.entries]
+        self.term_en: List[str] = [_norm(e.get("term_en", "")) for e in self.entries]
+        self.acronym: List[str] = [_norm(e.get("acronym", "")) for e in self.entries]
+
+        # Final replacement per row, computed once for each source language:
+        #   ES → EN + optional acronym   ("intravenosa" -> "IV (intravenous)")
+        #   EN → ES (acronyms map too)   ("IV" -> "vía intravenosa")
+        self.final_for_src: Dict[str, List[str]] = {
+            "es": [f"{ac} ({en})" if ac else en for en, ac in zip(self.term_en, self.acronym)],
+            "en": self.term_es,
+        }
+
+        self.matchers: Dict[str, Tuple[re.Pattern, re.Pattern, object, Dict[str, int]]] = {}
+        self._ignorecase: Dict[str, re.Pattern] = {}
         self._compile_all()
 
+        # Repeated snippets skip the scan; entries never change after init
+        # (/reload builds a new Glossary), so the cache needs no invalidation
+        self._apply_cached = functools.lru_cache(maxsize=1024)(self._apply_uncached)
+
     # --------------------------------------------------
     # Generate variants (ES, EN, acronyms + aliases)
     # --------------------------------------------------
-    def _make_variants(self, entry: Dict) -> List[Tuple[str, str, str]]:
+    def _make_variants(self, row: int) -> List[Tuple[str, str, str]]:
         """
         Returns list of (variant_text, variant_language, variant_type)
         variant_type ∈ {"main", "alias", "acronym"}
         """
         variants = []
 
-        term_es = _norm(entry.get("term_es", ""))
-        term_en = _norm(entry.get("term_en", ""))
-        acronym = _norm(entry.get("acronym", ""))
+        entry = self.entries[row]
+        term_es = self.term_es[row]
+        term_en = self.term_en[row]
+        acronym = self.acronym[row]
 
         # Spanish main term
         if term_es:
@@ -48,13 +97,10 @@ class Glossary:
         if term_en:
             variants.append((term_en, "en", "main"))
 
-        # Acronyms — must match both directions
+        # Acronyms — matching is case-insensitive and resolved through the
+        # lowercase lookup table, so one variant covers IV / iv / Iv
         if acronym:
-            variants.extend([
-                (acronym, "acronym", "acronym"),
-                (acronym.upper(), "acronym", "acronym"),
-                (acronym.lower(), "acronym", "acronym"),
-            ])
+            variants.append((acronym, "acronym", "acronym"))
 
         # Aliases ES
         for a in entry.get("aliases_es", []):
@@ -71,80 +117,185 @@ class Glossary:
         return variants
 
     # --------------------------------------------------
-    # Compile regex patterns
+    # Compile one matcher per source language
     # --------------------------------------------------
     def _compile_all(self):
-        self.compiled = []
+        """
+        Builds, for each source language, a lookup variant.lower() -> row index
+        and either an Aho–Corasick automaton (pyahocorasick installed) or,
+        without it, a single alternation regex with every variant (longest
+        first) plus a smaller one with only the ASCII variants (the only
+        ones that can match ASCII text). Either one scans the text in a
+        single pass.
+        """
+        variants_by_src = {"es": [], "en": []}
+
+        for row in range(len(self.entries)):
+            for variant, lang, vtype in self._make_variants(row):
+                # ES source only matches ES variants; EN source matches EN + acronyms
+                src = "es" if lang == "es" else "en"
+                variants_by_src[src].append((variant, row))
+
+        self.matchers = {}
+
+        for src, variants in variants_by_src.items():
+            # Prioritize multi‑word & longer matches (alternation is first‑match):
+            # bucket by length, then walk the few distinct lengths longest-first
+            by_length: Dict[int, List[Tuple[str, int]]] = {}
+            for variant, row in variants:
+                by_length.setdefault(len(variant), []).append((variant, row))
+
+            lookup: Dict[str, int] = {}
+            for length in sorted(by_length, reverse=True):
+                for variant, row in by_length[length]:
+                    lookup.setdefault(sys.intern(variant.lower()), row)
+
+            if not lookup:
+                self.matchers[src] = (None, None, None, lookup)
+                continue
+
+            if ahocorasick is not None:
+                automaton = ahocorasick.Automaton()
+                for key in lookup:
+                    automaton.add_word(key, key)
+                automaton.make_automaton()
+                self.matchers[src] = (None, None, automaton, lookup)
+                continue
+
+            # Keys are already lowercase: the regex runs case-sensitively on
+            # text.lower() instead of case-folding every compare
+            pattern = self._compile_alternation(lookup)
+            ascii_keys = [k for k in lookup if k.isascii()]
+            ascii_pattern = self._compile_alternation(ascii_keys, self._re.ASCII) if ascii_keys else None
 
-        for entry in self.entries:
-            for variant, lang, vtype in self._make_variants(entry):
-                pattern = re.compile(
-                    rf"(?<![A-Za-z0-9]){re.escape(variant)}(?![A-Za-z0-9])",
-                    flags=re.IGNORECASE | re.UNICODE
-                )
-                self.compiled.append((pattern, entry, lang, vtype))
+            self.matchers[src] = (pattern, ascii_pattern, None, lookup)
 
-        # Prioritize multi‑word & longer matches
-        self.compiled.sort(key=lambda i: -len(i[0].pattern))
+    def _compile_alternation(self, keys, flags=0) -> re.Pattern:
+        alternation = "|".join(re.escape(k) for k in keys)
+        if self._re is re:
+            return re.compile(rf"(?<![A-Za-z0-9])(?:{alternation})(?![A-Za-z0-9])", flags)
+        # `regex`: atomic group, once a variant matched with its trailing
+        # boundary the engine does not backtrack into the other alternatives
+        return self._re.compile(
+            rf"(?<![A-Za-z0-9])(?>(?:{alternation})(?![A-Za-z0-9]))",
+            flags
+        )
+
+    def _ignorecase_pattern(self, src: str) -> re.Pattern:
+        """
+        Case-insensitive alternation for text whose lower() changes length;
+        rare, so it is compiled on first use.
+        """
+        pattern = self._ignorecase.get(src)
+        if pattern is None:
+            lookup = self.matchers[src][3]
+            pattern = self._ignorecase[src] = self._compile_alternation(lookup, self._re.IGNORECASE)
+        return pattern
+
+    # --------------------------------------------------
+    # Matching
+    # --------------------------------------------------
+    def _scan_regex(self, pattern: re.Pattern, text: str):
+        """Returns non-overlapping (start, end, key) spans."""
+        return [(m.start(), m.end(), m.group(0).lower()) for m in pattern.finditer(text)]
+
+    def _scan_automaton(self, automaton, text: str, text_lower: str):
+        """
+        Returns non-overlapping (start, end, key) spans, leftmost-longest,
+        with the same word boundaries as the regex matcher.
+        """
+        n = len(text)
+        candidates = []
+        for last, key in automaton.iter(text_lower):
+            start = last - len(key) + 1
+            end = last + 1
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < n and _is_word_char(text[end]):
+                continue
+            candidates.append((start, -end, key))
+
+        candidates.sort()
+        spans = []
+        pos = 0
+        for start, neg_end, key in candidates:
+            if start >= pos:
+                spans.append((start, -neg_end, key))
+                pos = -neg_end
+        return spans
 
     # --------------------------------------------------
     # Placeholders
     # --------------------------------------------------
     def _placeholder(self, idx: int):
-        return f"GLOSARIOPH{idx:04d}TOKEN"
+        return f'<x id="{idx}"/>'
 
-    def apply_placeholders(self, text: str, src_lang: str):
+    def apply_placeholders(self, text: str, src_lang: str, protect=None):
         """
         Replace terms with placeholders.
         src_lang: "en" or "es"
+        protect: optional str -> str applied only to the text between
+                 matched terms (e.g. TextProtector.protect), fused into the
+                 same splice instead of a second pass over the result
         """
         if not text:
             return text, {}, False
 
-        result = text
-        placeholder_map = {}
-        idx = 1
-        hits = False
+        src = "es" if src_lang == "es" else "en"
+        result, items, had_hits = self._apply_cached(text, src, protect)
+        # fresh dict per call: callers may mutate their placeholder_map
+        return result, dict(items), had_hits
 
-        for pattern, entry, variant_lang, vtype in self.compiled:
+    def _apply_uncached(self, text: str, src: str, protect=None):
+        """Body of apply_placeholders; returns the map as hashable items."""
+        literal = protect if protect is not None else _keep
+        pattern, ascii_pattern, automaton, lookup = self.matchers[src]
+        finals = self.final_for_src[src]
+        if not lookup:
+            return literal(text), (), False
 
-            # Filter by detected language
-            if src_lang == "es" and variant_lang not in ("es",):
-                continue
-            if src_lang == "en" and variant_lang not in ("en", "acronym"):
+        text_lower = text.lower()
+        if automaton is None and text.isascii():
+            # Non-ASCII variants can never match: scan with the ASCII-only set
+            if ascii_pattern is None:
+                return literal(text), (), False
+            spans = self._scan_regex(ascii_pattern, text_lower)
+        elif len(text_lower) == len(text):
+            # Match on the lowercase copy, splice into the original by offset
+            if automaton is not None:
+                spans = self._scan_automaton(automaton, text, text_lower)
+            else:
+                spans = self._scan_regex(pattern, text_lower)
+        else:
+            # lower() changed the length (e.g. "İ"): offsets would not line up
+            spans = self._scan_regex(self._ignorecase_pattern(src), text)
+
+        placeholder_map = {}
+        assigned = {}
+        next_idx = itertools.count(1).__next__
+        parts = []
+        pos = 0
+
+        for start, end, key in spans:
+            row = lookup.get(key)
+            if row is None:
                 continue
 
-            term_es = _norm(entry.get("term_es", ""))
-            term_en = _norm(entry.get("term_en", ""))
-            ac = _norm(entry.get("acronym", ""))
-
-            # -------------------------
-            # ES → EN + optional acronym
-            # -------------------------
-            if src_lang == "es":
-                if ac:
-                    # Example: "intravenosa" -> "IV (intravenous)"
-                    final = f"{ac} ({term_en})"
-                else:
-                    final = term_en
-
-            # -------------------------
-            # EN → ES (acronyms map too)
-            # -------------------------
-            else:  # src_lang == "en"
-                # Example: "IV" -> "vía intravenosa"
-                final = term_es
-
-            # Apply replacement
-            new_result, n = pattern.subn(self._placeholder(idx), result)
-
-            if n > 0:
-                hits = True
-                placeholder_map[self._placeholder(idx)] = final
-                idx += 1
-                result = new_result
-
-        return result, placeholder_map, hits
+            ph = assigned.get(key)
+            if ph is None:
+                ph = self._placeholder(next_idx())
+                assigned[key] = ph
+                placeholder_map[ph] = finals[row]
+
+            parts.append(literal(text[pos:start]))
+            parts.append(ph)
+            pos = end
+
+        if not placeholder_map:
+            return literal(text), (), False
+
+        parts.append(literal(text[pos:]))
+        return "".join(parts), tuple(placeholder_map.items()), True
 
     # --------------------------------------------------
     # Restore placeholders
@@ -152,9 +303,8 @@ class Glossary:
     def restore_placeholders(self, text: str, placeholder_map: Dict[str, str]):
         if not placeholder_map:
             return text
-        for ph, val in placeholder_map.items():
-            text = text.replace(ph, val)
-        return text
+        # One pass over the text instead of one str.replace per placeholder
+        return PLACEHOLDER_RE.sub(lambda m: placeholder_map.get(m.group(0), m.group(0)), text)
 
     # For /health endpoint
     def size(self):
@@ -12,31 +12,29 @@ class TextNormalizer:
 
     def __init__(self):
         # Precompilación de patrones comunes
-        self.multiple_spaces = re.compile(r"\s+")
+        # Un solo patrón: espacios antes de puntuación (grupo 1) o rachas de espacios
+        self.spacing = re.compile(r"\s+([.,;:!?])|\s+")
         self.multiple_newlines = re.compile(r"\n{3,}")
-        self.safe_punctuation = re.compile(r"[ ]+([.,;:!?])")
+        # Tabla de caracteres invisibles: una sola pasada con str.translate
+        self._strip_table = str.maketrans({"\x00": "", "\u200b": "", "\ufeff": "", "\xa0": " "})
 
     def normalize(self, text: str) -> str:
         """
         Normaliza texto manteniendo estructura lingüística.
+        El resultado siempre está en NFC (el pipeline no vuelve a normalizar).
         """
         if not isinstance(text, str):
             return text
 
         # 1. Remover caracteres invisibles problemáticos
-        text = (
-            text.replace("\x00", "")
-                .replace("\u200b", "")
-                .replace("\ufeff", "")
-                .replace("\xa0", " ")
-        )
+        text = text.translate(self._strip_table)
 
-        # 2. Normalización Unicode
-        text = unicodedata.normalize("NFC", text)
+        # 2. Normalización Unicode (se omite si ya es ASCII o NFC)
+        if not text.isascii() and not unicodedata.is_normalized("NFC", text):
+            text = unicodedata.normalize("NFC", text)
 
         # 3. Espaciado
-        text = self.multiple_spaces.sub(" ", text)
-        text = self.safe_punctuation.sub(r"\1", text)
+        text = self.spacing.sub(lambda m: m.group(1) or " ", text)
         text = self.multiple_newlines.sub("\n\n", text)
 
         return text.strip()